@@ -17,9 +17,8 @@
 # You should have received a copy of the GNU General Public License
 # along with epydemic-signals. If not, see <http://www.gnu.org/licenses/gpl.html>.
 
-from heapq import heappush, heappop
 from typing import Dict, Any, List, Tuple, cast
-from networkx import Graph, single_source_shortest_path
+from networkx import Graph
 from epydemic import Node, Edge, SIR, Process, CompartmentedModel
 from epydemic_signals import Signal, SignalGenerator
 
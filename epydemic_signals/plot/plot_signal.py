@@ -18,6 +18,7 @@
 # along with epydemic-signals. If not, see <http://www.gnu.org/licenses/gpl.html>.
 
 from typing import Dict, Any, List, Tuple
+from heapq import nsmallest, nlargest
 from networkx import spring_layout
 import matplotlib.pyplot as plt
 from matplotlib.colors import Colormap, Normalize, TwoSlopeNorm
@@ -59,9 +60,13 @@ def plot_signal(s: Signal, t: float,
     s_t = s[t]
     colours = [s_t[n] for n in g.nodes()]
     if vmin is None and vmax is None:
-        vs = list(s.values())
-        vs.sort()
-        (vmin, vmax) = (vs[1], vs[-2])  # avoid endpoints in case of infinities
+        # use the second-smallest and second-largest values, to avoid
+        # endpoints in case of infinities
+        vs = s.values()
+        if len(vs) < 2:
+            raise ValueError('Need at least two distinct signal values to find a default range')
+        vmin = nsmallest(2, vs)[-1]
+        vmax = nlargest(2, vs)[-1]
     elif vmin is None or vmax is None:
         raise ValueError('Need to provide both minimum and maximum signal value, or neither')
 
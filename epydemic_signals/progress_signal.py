@@ -17,13 +17,54 @@
 # You should have received a copy of the GNU General Public License
 # along with epydemic-signals. If not, see <http://www.gnu.org/licenses/gpl.html>.
 
-from heapq import heappush, heappop
-from typing import Dict, Any, List, Set, Tuple, cast
-from networkx import Graph, single_source_shortest_path
+from typing import Dict, Any, List, Set, Tuple, Optional, cast
+from networkx import Graph
 from epydemic import Node, Edge, SIR, Process, CompartmentedModel
 from epydemic_signals import Signal, SignalGenerator
 
 
+def _bfsToTarget(adj: List[List[int]], comp: List[int],
+                 seen: List[int], gen: int,
+                 s: int, target: int, onpath: int) -> Optional[Tuple[int, int]]:
+    '''Breadth-first search from a node for the nearest node with the target
+    compartment code, passing only through nodes whose code is in the
+    path codes. The path codes are given as a mask, with bit :math:`c`
+    set to include nodes with code :math:`c`. The search works entirely
+    on node indices: nodes are described by their adjacency lists and
+    compartment codes, and visited marks are taken from the given
+    generation.
+
+    :param adj: the adjacency list of indices for each index
+    :param comp: the compartment code of each index
+    :param seen: the generation at which each index was last visited
+    :param gen: the generation for this search
+    :param s: the source index
+    :param target: the target compartment code
+    :param onpath: the mask of compartment codes of nodes included in the path
+    :returns: the index of the target and the distance, or None if there is no path'''
+    seen[s] = gen
+    frontier = []
+    for j in adj[s]:
+        frontier.append(j)
+        seen[j] = gen
+
+    d = 1
+    while len(frontier) > 0:
+        next = []
+        for i in frontier:
+            c = comp[i]
+            if c == target:
+                return (i, d)
+            if onpath & (1 << c):
+                for j in adj[i]:
+                    if seen[j] != gen:
+                        next.append(j)
+                        seen[j] = gen
+        frontier = next
+        d += 1
+    return None
+
+
 class SIRProgressSignalGenerator(SignalGenerator):
     '''Create the progress signal for an SIR epidemic.
 
@@ -44,13 +85,31 @@ class SIRProgressSignalGenerator(SignalGenerator):
     :param s: the signal
     '''
 
+    # Integer codes for the compartments, as held in the dense compartment list
+    _S = 0
+    _I = 1
+    _R = 2
+    _CODE = {SIR.SUSCEPTIBLE: _S, SIR.INFECTED: _I, SIR.REMOVED: _R}
+
+    __slots__ = ('_inf', '_boundary', '_coboundary_S', '_coboundary_R',
+                 '_index', '_nodes', '_adj', '_comp',
+                 '_visited', '_visitedPure', '_gen', '_maxS', '_setPool')
+
     def __init__(self, s: Signal = None):
         super().__init__(s)
         self._inf: int = None
-        self._compartment: Dict[str, Set[str]] = dict()    # the compartment of a node
-        self._boundary: Dict[Any, Any] = dict()            # the closest I to an S or R
-        self._coboundary_S: Dict[Any, Set[Any]] = dict()   # the set of S that this I is the closest for
-        self._coboundary_R: Dict[Any, Set[Any]] = dict()   # the set of R that this I isthe closest for
+        self._boundary: List[int] = []                     # index of the closest I to an S or R, or -1
+        self._coboundary_S: Dict[int, Set[int]] = dict()   # indices of the S that the I at this index is the closest for
+        self._coboundary_R: Dict[int, Set[int]] = dict()   # indices of the R that the I at this index is the closest for
+        self._index: Dict[Any, int] = dict()               # dense index of each node
+        self._nodes: List[Any] = []                        # node at each index
+        self._adj: List[List[int]] = []                    # indices of the neighbours of each index
+        self._comp: List[int] = []                         # compartment code of each node's index
+        self._visited: List[int] = []                      # generation at which each node was last visited
+        self._visitedPure: List[int] = []                  # generation at which each node was last visited along susceptibles
+        self._gen: int = 0                                 # current visiting generation
+        self._maxS: int = 0                                # upper bound on the signal at any susceptible
+        self._setPool: List[Set[int]] = []                 # emptied coboundary sets available for re-use
 
         # register the event handlers
         self.addEventTypeHandler(SIR.INFECTED, self.infect)
@@ -65,6 +124,17 @@ class SIRProgressSignalGenerator(SignalGenerator):
         :returns: the infinity value'''
         return self._inf
 
+    def compartment(self, c: str) -> Set[Any]:
+        '''Return the nodes currently in the given compartment. The
+        compartments are held internally as a code per node, so this
+        builds the set afresh on each call.
+
+        :param c: the compartment
+        :returns: the set of nodes in that compartment'''
+        code = self._CODE[c]
+        comp = self._comp
+        return set(n for (i, n) in enumerate(self._nodes) if comp[i] == code)
+
     def process(self) -> Process:
         '''Return the process this generator is monitoring.
 
@@ -84,106 +154,168 @@ class SIRProgressSignalGenerator(SignalGenerator):
         p = self.process()
         signal = s[0.0]
 
+        # index the nodes densely so that visited marks can be kept in a
+        # single list, re-used across searches by bumping the generation
+        # rather than allocating a new set for every search. We use the
+        # signal's order for the nodes, so our indices are the same as its
+        self._nodes = s.nodes()
+        self._index = dict()
+        for (i, n) in enumerate(self._nodes):
+            self._index[n] = i
+        self._visited = [0] * g.order()
+        self._visitedPure = [0] * g.order()
+        self._gen = 0
+
+        # neighbours by index, so searches never need to go back to the graph
+        self._adj = [[self._index[m] for m in g.neighbors(n)] for n in self._nodes]
+
+        # no node has a boundary yet
+        self._boundary = [-1] * g.order()
+        self._coboundary_S = dict()
+        self._coboundary_R = dict()
+
         # extract the initial state and signal
         self._inf = g.order() + 1           # a distance longer than the longest possible path
-        self._compartment = dict()
-        self._compartment[SIR.SUSCEPTIBLE] = set()
-        self._compartment[SIR.INFECTED] = set()
-        self._compartment[SIR.REMOVED] = set()
+        self._comp = [self._S] * g.order()
+        infecteds = []
         cm = cast(CompartmentedModel, p)
         for n in g.nodes():
             # grab initial compartment
-            self._compartment[cm.getCompartment(n)].add(n)
+            c = self._CODE[cm.getCompartment(n)]
+            self._comp[self._index[n]] = c
+            if c == self._I:
+                infecteds.append(n)
+            elif c == self._R:
+                # don't handle initial removeds in the population for now
+                raise ValueError('Initial network contains removed nodes')
 
             # signal is initially infinite everywhere
             signal[n] = self.infinity()
-        if len(self._compartment[SIR.REMOVED]) > 0:
-            # don't handle initial removeds in the population for now
-            raise ValueError('Initial network contains removed nodes')
 
-        # compute the initial signal at t=0
+        # compute the initial signal at t=0. Each susceptible needs only the
+        # distance to its *closest* infected, so we search outwards from all
+        # the infecteds at once, one distance at a time: the first time we
+        # reach a susceptible is along a shortest path, and the infected
+        # we came from is its boundary
         #print('initial infecteds to susceptibles')
-        for s in self._compartment[SIR.INFECTED]:
+        index = self._index
+        nodes = self._nodes
+        visited = self._visited
+        comp = self._comp
+        boundary = self._boundary
+        coboundary_S = self._coboundary_S
+        coboundary_R = self._coboundary_R
+        adj = self._adj
+        S = self._S
+        self._gen += 1
+        gen = self._gen
+        frontier = []
+        for s in infecteds:
             signal[s] = 0
-            distance = []
-            heappush(distance, (0, s))
-            visited = set()
-            self._coboundary_S[s] = set()
-            self._coboundary_R[s] = set()
-            while len(distance) > 0:
-                (_, n) = heappop(distance)
-                if n not in visited:
-                    #print(f'visit {n}')
-                    visited.add(n)
-                    d = 1 + signal[n]
-                    for m in g.neighbors(n):
-                        if m not in visited:
-                            if m in self._compartment[SIR.SUSCEPTIBLE]:
-                                if d < signal[m]:
-                                    # update the signal
-                                    signal[m] = d
-                                    heappush(distance, (d, m))
-                                    #print(f'propose {m} distance {d}')
-
-                                    # update the boundary
-                                    if m in self._boundary:
-                                        self._coboundary_S[self._boundary[m]].remove(m)
-                                    self._boundary[m] = s
-                                    self._coboundary_S[s].add(m)
-                                    #print(f'Sus boundary of {m} now {s}')
-                                else:
-                                    # prune the tree
-                                    #print(f'prune {m}')
-                                    #visited.add(m)
-                                    pass
-                            else:
-                                # prune the tree
-                                #print(f'prune {m}')
-                                visited.add(m)
+            si = index[s]
+            coboundary_S[si] = self._newSet()
+            coboundary_R[si] = self._newSet()
+            visited[si] = gen
+            frontier.append((si, si))
+        d = 1
+        while len(frontier) > 0:
+            next = []
+            for (i, b) in frontier:
+                for j in adj[i]:
+                    if visited[j] != gen:
+                        visited[j] = gen
+                        if comp[j] == S:
+                            # update the signal and boundary
+                            signal[nodes[j]] = d
+                            boundary[j] = b
+                            coboundary_S[b].add(j)
+                            next.append((j, b))
+                            #print(f'Sus boundary of {nodes[j]} now {nodes[b]}')
+            frontier = next
+            d += 1
+
+        # record the largest finite susceptible signal, which bounds how far
+        # an infection can change the signal. Susceptibles at infinity are
+        # ignored, as they can only be reached by infecting a node that was
+        # itself at infinity
+        maxS = 0
+        for (i, n) in enumerate(nodes):
+            if comp[i] == S and signal[n] != self._inf:
+                maxS = max(maxS, signal[n])
+        self._maxS = maxS
 
         #print('initial signal')
         #for n in g.nodes():
         #    print(n, signal[n])
 
-    def _shortestPath(self, s, target, onpath):
-        '''Return the length of the shortest path from the node to a
-        node in the target set, traversing only nodes in the path set.
+    def _newSet(self) -> Set[int]:
+        '''Return an empty set for use as a coboundary, re-using one
+        released earlier if possible.
 
-        :param s: the node
-        :param target: the compartment of the target set
-        :param onpath: the compartments of nodes included in the path
-        :returns: the node and the shortest path, or None if there is no path'''
-        g = self.network()
-        distance = []
-        seen = set([s])
-
-        # add all neighbours of the source node to be visited
-        for m in g.neighbors(s):
-            heappush(distance, (1, m))
-            seen.add(m)
+        :returns: an empty set'''
+        if len(self._setPool) > 0:
+            return self._setPool.pop()
+        else:
+            return set()
 
-        # breadth-first traverse the network
-        while len(distance) > 0:
-            (d, n) = heappop(distance)
+    def _releaseSet(self, ns: Set[int]):
+        '''Release a coboundary set that's no longer needed, emptying
+        it and keeping it for re-use by :meth:`_newSet`.
 
-            # check if we've hit the target
-            if n in self._compartment[target]:
-                # found a node in the target set, return the node and distance
-                return (n, d)
+        :param ns: the set'''
+        ns.clear()
+        self._setPool.append(ns)
 
-            # if we're potentially on the path, visit all neighbours
-            dprime = d + 1
-            for c in onpath:
-                if n in self._compartment[c]:
-                    ms = g.neighbors(n)
-                    for m in ms:
-                        if m not in seen:
-                            heappush(distance, (dprime, m))
-                            seen.add(m)
-                    break
-
-        # if we get here, there are no targets accessible from s
-        return None
+    def _shortestPath(self, s: int, target: int, onpath: int) -> Optional[Tuple[int, int]]:
+        '''Return the length of the shortest path from the node to a
+        node in the target compartment, traversing only nodes in the path
+        compartments. Nodes are given by index and compartments by code,
+        with the path compartments as a mask of codes.
+
+        :param s: the index of the node
+        :param target: the code of the target compartment
+        :param onpath: the mask of codes of compartments of nodes included in the path
+        :returns: the index of the target and the shortest path, or None if there is no path'''
+        self._gen += 1
+        return _bfsToTarget(self._adj, self._comp, self._visited, self._gen,
+                            s, target, onpath)
+
+    def _nearestInfecteds(self, qs: Set[int]) -> Dict[int, Tuple[int, int]]:
+        '''Find the nearest infected node to each of a set of nodes, along
+        paths traversing only susceptible or removed nodes. Rather than
+        search outwards from each node separately, we search outwards from
+        all the infected nodes at once, stopping once every node has been
+        reached: the infected a node is first reached from is its nearest.
+
+        :param qs: the indices of the nodes
+        :returns: a dict from the index of each reachable node to the index of its nearest infected and the distance'''
+        adj = self._adj
+        seen = self._visited
+        self._gen += 1
+        gen = self._gen
+
+        # every infected node has an S coboundary, so we use these to find them
+        frontier = []
+        for i in self._coboundary_S:
+            seen[i] = gen
+            frontier.append((i, i))
+
+        found: Dict[int, Tuple[int, int]] = dict()
+        remaining = len(qs)
+        d = 1
+        while len(frontier) > 0 and remaining > 0:
+            next = []
+            for (i, b) in frontier:
+                for j in adj[i]:
+                    if seen[j] != gen:
+                        seen[j] = gen
+                        if j in qs:
+                            found[j] = (b, d)
+                            remaining -= 1
+                        next.append((j, b))
+            frontier = next
+            d += 1
+        return found
 
     def infect(self, t: float, e: Edge):
         '''Adjust the signal for an infection event.
@@ -191,103 +323,137 @@ class SIRProgressSignalGenerator(SignalGenerator):
         :param t: the event time
         :param e: the SI edge the infection passed over'''
         (s, _) = e
-        g = self.network()
         signal = self.signal()[t]
+        index = self._index
+        nodes = self._nodes
+        seen = self._visited
+        comp = self._comp
+        boundary = self._boundary
+        coboundary_S = self._coboundary_S
+        coboundary_R = self._coboundary_R
+        adj = self._adj
+        (S, I, R) = (self._S, self._I, self._R)
+        si = index[s]
         #print('infect', s)
 
         # update state
         #print('Phase I-1')
-        self._compartment[SIR.SUSCEPTIBLE].remove(s)
-        if s in self._boundary:
+        comp[si] = I
+        b = boundary[si]
+        if b != -1:
             # s has a boundary, remove it from that node's co-boundary
-            #print('remove boundary', self._boundary[s])
-            self._coboundary_S[self._boundary[s]].remove(s)
-            del self._boundary[s]
+            #print('remove boundary', nodes[b])
+            coboundary_S[b].remove(si)
+            boundary[si] = -1
 
             # (The only way s will *not* have a boundary is if the initial
             # state of the network was all susceptibles with no infecteds.
             # It might be worth handling this as a special case?)
-        self._compartment[SIR.INFECTED].add(s)
 
-        # set signal at s
+        # set signal at s, noting whether it was previously unreachable
+        unreachable = (signal[s] == self._inf)
         signal[s] = 0
 
-        # iterate all susceptible nodes updating signal as the
-        # shortest path length to an infected node passing only over susceptibles
-        #print('Phase I-2')
-        self._coboundary_S[s] = set()
-        distance = []
-        for m in g.neighbors(s):
-            heappush(distance, (1, m))
-        seen = set([s])
-        while len(distance) > 0:
-            (d, n) = heappop(distance)
-
-            if n in self._compartment[SIR.SUSCEPTIBLE]:
-                # check if we're closer
-                if d < signal[n]:
-                    # yes, update and pass through
-                    signal[n] = d
-                    #heappush(distance, (d, n))
-                    #print(f'propose {n} distance {d}')
-
-                    if n in self._boundary:
-                        self._coboundary_S[self._boundary[n]].remove(n)
-                    self._boundary[n] = s
-                    self._coboundary_S[s].add(n)
-                    #print(f'Sus boundary of {n} now {s}')
-
-                    dprime = d + 1
-                    for m in g.neighbors(n):
-                        if m not in seen:
-                            heappush(distance, (dprime, m))
-                            seen.add(m)
-                else:
-                    # we're farther than the shortest distance already, prune
-                    pass
-
-        # iterate all removed nodes updating signal as the shortest path length
-        # to an infected node passing only susceptibles or removeds
-        #print('Phase I-3')
-        self._coboundary_R[s] = set()
-        for m in g.neighbors(s):
-            heappush(distance, (1, m))
-        seen = set([s])
-        while len(distance) > 0:
-            (d, n) = heappop(distance)
-
-            if n in self._compartment[SIR.SUSCEPTIBLE]:
-                # we can pass through this node
-                dprime = d + 1
-                for m in g.neighbors(n):
-                    if m not in seen:
-                        heappush(distance, (dprime, m))
-                        seen.add(m)
-            elif n in self._compartment[SIR.REMOVED]:
-                # check if we're closer
-                if -d > signal[n]:
-                    # yes, update and pass through
-                    signal[n] = -d
-                    #heappush(distance, (d, n))
-                    #print(f'propose {n} distance {d}')
-
-                    if n in self._boundary:
-                        self._coboundary_R[self._boundary[n]].remove(n)
-                    self._boundary[n] = s
-                    self._coboundary_R[s].add(n)
-                    #print(f'Rem boundary of {n} now {s}')
-
-                    dprime = d + 1
-                    for m in g.neighbors(n):
-                        if m not in seen:
-                            heappush(distance, (dprime, m))
-                            seen.add(m)
-                else:
-                    # we're farther than the shortest distance already, prune
-                    pass
-
-        #print(f'Sus coboundary of {s} now', self._coboundary_S[s], 'signal', signal[s])
-        #print(f'Rem coboundary of {s} now', self._coboundary_R[s])
+        # iterate all susceptible nodes updating signal as the shortest path
+        # length to an infected node passing only over susceptibles, and all
+        # removed nodes updating signal as the shortest path length passing
+        # over susceptibles or removeds. Both are found in a single search
+        # over susceptibles and removeds, in which each visit records whether
+        # the node was reached along a path of only susceptibles ("pure")
+        # and whether this is the first time it's been reached at all. The
+        # two kinds of visit are marked separately, as a node may be reached
+        # first along an impure path and later along a pure one.
+        #
+        # Pure visits are only followed through susceptibles whose signal
+        # we've reduced, and are never queued further away than the bound
+        # on the susceptible signals (since no susceptible signal could be
+        # reduced there). Other visits pass through all susceptibles, and
+        # through removeds whose signal we've increased.
+        #print('Phase I-2 and I-3')
+        coboundary_S[si] = self._newSet()
+        coboundary_R[si] = self._newSet()
+        # if s was unreachable then so were the susceptibles it can now
+        # reach, which may lie beyond the bound, so don't bound the search
+        maxS = self._inf if unreachable else self._maxS
+        grownS = self._maxS
+        seenPure = self._visitedPure
+        self._gen += 1
+        gen = self._gen
+        seen[si] = gen
+        seenPure[si] = gen
+        frontier = []
+        for j in adj[si]:
+            pure = (comp[j] == S)
+            if pure:
+                seenPure[j] = gen
+            frontier.append((j, pure, True))
+            seen[j] = gen
+
+        # all edges have unit weight, so rather than a priority queue we
+        # work outwards one distance at a time, each distance's nodes being
+        # held in a list and visited before the next distance's
+        d = 1
+        while len(frontier) > 0:
+            dprime = d + 1
+            next = []
+            for (i, pure, first) in frontier:
+                n = nodes[i]
+                c = comp[i]
+                followPure = False
+                followAll = False
+                if c == S:
+                    # check if we're closer along a pure path
+                    if pure and d < signal[n]:
+                        # yes, update and pass through
+                        signal[n] = d
+                        if d > grownS:
+                            grownS = d
+                        #print(f'propose {n} distance {d}')
+
+                        b = boundary[i]
+                        if b != -1:
+                            coboundary_S[b].remove(i)
+                        boundary[i] = si
+                        coboundary_S[si].add(i)
+                        #print(f'Sus boundary of {n} now {s}')
+                        followPure = True
+
+                    # we can always pass through a susceptible
+                    followAll = first
+                elif c == R:
+                    # check if we're closer
+                    if first and -d > signal[n]:
+                        # yes, update and pass through
+                        signal[n] = -d
+                        #print(f'propose {n} distance {d}')
+
+                        b = boundary[i]
+                        if b != -1:
+                            coboundary_R[b].remove(i)
+                        boundary[i] = si
+                        coboundary_R[si].add(i)
+                        #print(f'Rem boundary of {n} now {s}')
+                        followAll = True
+                    else:
+                        # we're farther than the shortest distance already, prune
+                        pass
+
+                if followPure or followAll:
+                    for j in adj[i]:
+                        p = followPure and dprime <= maxS and comp[j] == S and seenPure[j] != gen
+                        a = followAll and seen[j] != gen
+                        if p or a:
+                            if p:
+                                seenPure[j] = gen
+                            if a:
+                                seen[j] = gen
+                            next.append((j, p, a))
+            frontier = next
+            d = dprime
+        self._maxS = grownS
+
+        #print(f'Sus coboundary of {s} now', self._coboundary_S[si], 'signal', signal[s])
+        #print(f'Rem coboundary of {s} now', self._coboundary_R[si])
 
     def remove(self, t: float, s: Node):
         '''Adjust the signal for a removal event.
@@ -295,76 +461,147 @@ class SIRProgressSignalGenerator(SignalGenerator):
         :param t: the event time
         :param n: the node'''
         #print(f'remove {s}')
-        g = self.network()
         signal = self._signal[t]
+        index = self._index
+        nodes = self._nodes
+        adj = self._adj
+        comp = self._comp
+        boundary = self._boundary
+        coboundary_S = self._coboundary_S
+        coboundary_R = self._coboundary_R
+        (S, I, R) = (self._S, self._I, self._R)
+        si = index[s]
 
         # update state
-        self._compartment[SIR.INFECTED].remove(s)
-        self._compartment[SIR.REMOVED].add(s)
-
-        # re-compute all susceptible distances affected by our removal
+        comp[si] = R
+
+        # re-compute all susceptible distances affected by our removal.
+        # These are exactly the nodes in our S coboundary: every other
+        # susceptible has a closest infected other than s, and so keeps
+        # its distance. Rather than search outwards from each of these
+        # nodes separately we seed them all from their neighbours outside
+        # the coboundary, whose distances are still valid, and then relax
+        # inwards in a single search ordered by distance
         #print('Phase R-1')
-        for q in self._coboundary_S[s]:
-            sp = self._shortestPath(q, SIR.INFECTED, [SIR.SUSCEPTIBLE])
-            if sp is None:
+        affected = coboundary_S[si]
+        inf = self.infinity()
+        best: Dict[int, int] = dict()
+        nearest: Dict[int, int] = dict()
+        buckets: Dict[int, List[int]] = dict()
+        for q in affected:
+            for j in adj[q]:
+                if j in affected:
+                    continue
+                c = comp[j]
+                if c == I:
+                    (d, b) = (1, j)
+                elif c == S:
+                    d = signal[nodes[j]]
+                    if d == inf:
+                        continue
+                    (d, b) = (d + 1, boundary[j])
+                else:
+                    continue
+                if d < best.get(q, inf):
+                    best[q] = d
+                    nearest[q] = b
+            if q in best:
+                buckets.setdefault(best[q], []).append(q)
+        if len(buckets) > 0:
+            d = min(buckets.keys())
+            while len(buckets) > 0:
+                qs = buckets.pop(d, [])
+                dprime = d + 1
+                for q in qs:
+                    if best[q] != d:
+                        # superseded by a shorter distance
+                        continue
+                    for j in adj[q]:
+                        if j in affected and dprime < best.get(j, inf):
+                            best[j] = dprime
+                            nearest[j] = nearest[q]
+                            buckets.setdefault(dprime, []).append(j)
+                d = dprime
+
+        maxS = self._maxS
+        for q in affected:
+            n = nodes[q]
+            if q not in best:
                 # no infected nodes found, set to infinity
-                #print(f'no infected left accessible by {q}')
-                signal[q] = self.infinity()
+                #print(f'no infected left accessible by {n}')
+                signal[n] = inf
+                boundary[q] = -1
             else:
-                (n, d) = sp
+                (b, d) = (nearest[q], best[q])
 
                 # update signal at this node if needed
-                if d != signal[q]:
-                    if d < signal[q]:
-                        raise ValueError('Signal at {q} got smaller {before} {after}???'.format(q=q, after=d, before=signal[q]))
-                    signal[q] = d
-                    #print(f'update sus distance {q} {d}')
+                if d != signal[n]:
+                    if d < signal[n]:
+                        raise ValueError('Signal at {q} got smaller {before} {after}???'.format(q=n, after=d, before=signal[n]))
+                    signal[n] = d
+                    maxS = max(maxS, d)
+                    #print(f'update sus distance {n} {d}')
                 else:
-                    #print(f'sus distance {q} unchanged {d}')
+                    #print(f'sus distance {n} unchanged {d}')
                     pass
 
                 # update to the new, equidistant, boundary
-                self._boundary[q] = n
-                self._coboundary_S[n].add(q)
-                #print(f'update sus boundary {q} from {s} to {n}')
-        del self._coboundary_S[s]
-
-        # find distance from removed node to boundary
+                boundary[q] = b
+                coboundary_S[b].add(q)
+                #print(f'update sus boundary {n} from {s} to {nodes[b]}')
+        self._maxS = maxS
+        self._releaseSet(coboundary_S.pop(si))
+
+        # find the distances from the removed node, and from all the other
+        # removed nodes affected by our removal, to the boundary. With only
+        # the removed node to place we search outwards from it; otherwise
+        # we find all the nearest infecteds with a single search
         #print('Phase R-2')
-        sp = self._shortestPath(s, SIR.INFECTED, [SIR.SUSCEPTIBLE, SIR.REMOVED])
-        if sp is None:
+        coR = coboundary_R[si]
+        if len(coR) == 0:
+            sp = self._shortestPath(si, I, (1 << S) | (1 << R))
+            found = dict()
+            if sp is not None:
+                found[si] = sp
+        else:
+            qs = set(coR)
+            qs.add(si)
+            found = self._nearestInfecteds(qs)
+
+        if si not in found:
             # no infected nodes found, set to minus infinity
             #print(f'no infected left accessible by {s}')
-            signal[s] = -self.infinity()
+            signal[s] = -inf
         else:
-            (n, d) = sp
+            (b, d) = found[si]
 
             # update signal and boundary
             signal[s] = -d
-            #print('update to boundary', s, signal[s], n)
-            self._boundary[s] = n
-            self._coboundary_R[n].add(s)
+            #print('update to boundary', s, signal[s], nodes[b])
+            boundary[si] = b
+            coboundary_R[b].add(si)
 
         # update the signal for all other removed nodes affected by our removal
         #print('Phase R-3')
-        for q in self._coboundary_R[s]:
-            sp = self._shortestPath(q, SIR.INFECTED, [SIR.SUSCEPTIBLE, SIR.REMOVED])
-            if sp is None:
+        for q in coR:
+            n = nodes[q]
+            if q not in found:
                 # no infected nodes found, set to minus infinity
-                #print(f'no infected left accessible by {q}')
-                signal[q] = -self.infinity()
+                #print(f'no infected left accessible by {n}')
+                signal[n] = -inf
+                boundary[q] = -1
             else:
-                (n, d) = sp
+                (b, d) = found[q]
 
                 # update signal and boundary
-                if d != signal[q]:
-                    if -d > signal[q]:
-                        raise ValueError('Signal at {q} got smaller {before} {after}???'.format(q=q, after=d, before=signal[q]))
-                    signal[q] = -d
-                    #print('update in coboundary', q, signal[q], n)
-                self._boundary[q] = n
-                self._coboundary_R[n].add(q)
-        del self._coboundary_R[s]
+                if d != signal[n]:
+                    if -d > signal[n]:
+                        raise ValueError('Signal at {q} got smaller {before} {after}???'.format(q=n, after=d, before=signal[n]))
+                    signal[n] = -d
+                    #print('update in coboundary', n, signal[n], nodes[b])
+                boundary[q] = b
+                coboundary_R[b].add(q)
+        self._releaseSet(coboundary_R.pop(si))
 
         # for n in g.nodes():
         #     print(f'node {n}:')
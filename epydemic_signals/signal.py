@@ -18,7 +18,8 @@
 # along with epydemic-signals. If not, see <http://www.gnu.org/licenses/gpl.html>.
 
 from uuid import uuid4
-from typing import Dict, TypeVar, Generic, List, Tuple, Iterable
+from typing import Dict, TypeVar, Generic, List, Tuple, Iterable, Any
+from numpy import ndarray, array, empty
 from networkx import Graph
 from pandas import Series
 from epydemic import Node, Process
@@ -37,29 +38,38 @@ class Signal(Generic[V]):
 
     Signals are recorded as experimental results, using the name of
     the signal as part of the key for the representation in the lab notebook.
-    If no name is given then a UUID is generated, which is (pretty) unique but
-    entirely uninformative and so to be avoided.
+    If no name is given then a UUID is generated when the name is first
+    needed, which is (pretty) unique but entirely uninformative and so to
+    be avoided.
 
     :param g: (optional) the network over which the signal is defined
     :param name: (optional) the name of the signal'''
 
+    __slots__ = ('_name', '_network', '_nodes', '_nodeIdx', '_dict')
+
     def __init__(self, g: Graph = None, name: str = None):
-        # fill in the defaults
-        if name is None:
-            # use a stringified UUID as default unique name
-            name = str(uuid4())
-        self._name = name                              # the signal name
-        self._network: Graph = g                       # the domain of the signal
+        self._name = name                              # the signal name, or None if not yet named
+        self._network: Graph = None                    # the domain of the signal
+        self._nodes: List[Node] = []                   # the nodes of the domain, in a fixed order
+        self._nodeIdx: Dict[Node, int] = dict()        # the index of each node in that order
         self._dict: TimedDict[float, V] = TimedDict()  # the signal data structure
+        if g is not None:
+            self.setNetwork(g)
 
 
     # ---------- Accessing the signal ----------
 
     def setNetwork(self, g: Graph):
-        '''Set the network over which this signal is defined.
+        '''Set the network over which this signal is defined. This
+        also fixes an order for the network's nodes, which is
+        available through :meth:`nodes` and :meth:`nodeIndex`.
 
         :param g: the network'''
         self._network = g
+        self._nodes = list(g.nodes())
+        self._nodeIdx = dict()
+        for (i, n) in enumerate(self._nodes):
+            self._nodeIdx[n] = i
 
     def network(self) -> Graph:
         '''Return the network over which this signal is defined.
@@ -67,10 +77,39 @@ class Signal(Generic[V]):
         :returns: the network'''
         return self._network
 
+    def nodes(self) -> List[Node]:
+        '''Return the nodes of the network over which this signal is
+        defined, in the order fixed when the network was set. This
+        list shouldn't be modified.
+
+        :returns: the nodes'''
+        return self._nodes
+
+    def nodeIndex(self, n: Node) -> int:
+        '''Return the index of a node in the order given by :meth:`nodes`.
+
+        :param n: the node
+        :returns: the index'''
+        return self._nodeIdx[n]
+
+    def _domain(self) -> List[Node]:
+        '''Return the nodes to convert: those of the network if one
+        has been set, or otherwise every key that has had a value
+        at some time (as for a signal loaded from updates).
+
+        :returns: the nodes'''
+        if self._network is None:
+            return list(self._dict.keysAtSomeTime())
+        else:
+            return self._nodes
+
     def name(self ) -> str:
         '''Return the signal name.
 
         :returns: the signal name'''
+        if self._name is None:
+            # use a stringified UUID as default unique name
+            self._name = str(uuid4())
         return self._name
 
     def transitions(self) -> List[float]:
@@ -103,61 +142,87 @@ class Signal(Generic[V]):
 
     # ---------- Converting ----------
 
-    def toTimeSeries(self) -> Dict[Node, List[V]]:
+    def asArray(self) -> ndarray:
+        '''Return the signal as a `numpy` matrix with a row for each
+        time in :meth:`transitions` and a column for each node in
+        :meth:`nodes` (or, if the signal has no network, for each node
+        that has had a value). The matrix's element type is inferred
+        from the values.
+
+        :returns: the matrix'''
+        ns = self._domain()
+        ts = self.transitions()
+        if len(ts) == 0:
+            return empty((0, len(ns)))
+
+        # each of a node's updates holds its value from the transition at
+        # which it was made up to the node's next update, so we fill each
+        # node's column as a sequence of constant runs read from its diff list
+        row = dict()
+        for (r, t) in enumerate(ts):
+            row[t] = r
+        T = len(ts)
+        runs = []
+        distinct = set()
+        for (j, n) in enumerate(ns):
+            us = self._dict.diffs(n)
+            if len(us) == 0 or row[us[0][0]] > 0:
+                raise KeyError(f'No key {n} at time {ts[0]}')
+            for (k, (t, b, v)) in enumerate(us):
+                r = row[t]
+                if not b:
+                    raise KeyError(f'No key {n} at time {t}')
+                rnext = row[us[k + 1][0]] if k + 1 < len(us) else T
+                runs.append((r, rnext, j, v))
+                distinct.add((type(v), v))
+
+        # infer the element type from the distinct values (keeping values
+        # of different types that compare equal, such as 1 and 1.0), then
+        # fill the runs
+        M = empty((T, len(ns)), dtype=array([v for (_, v) in distinct]).dtype)
+        for (r, rnext, j, v) in runs:
+            M[r:rnext, j] = v
+        return M
+
+    def toTimeSeries(self) -> Dict[Node, ndarray]:
         '''Convert a node signal to a collection of time series for each
         node. The time series are all sampled at the same points, corresponding
-        to the series returned by :meth:`transitions`.
+        to the series returned by :meth:`transitions`. Each time series is
+        a `numpy` array, and all are views onto the matrix returned by
+        :meth:`asArray`.
 
         :returns: a dict of time series'''
-        g = self.network()
-        ns = list(g.nodes())
-        N = g.order()
+        M = self.asArray().T
         tss = dict()
-        for n in ns:
-            tss[n] = []
-
-        # we run through the times, retrieving the value for each node
-        # this is more efficient that traversing per-node due to the way
-        # TimedDict is implemented
-        for t in self.transitions():
-            s_t = self[t]
-            for n in ns:
-                tss[n].append(s_t[n])
-
+        for (i, n) in enumerate(self._domain()):
+            tss[n] = M[i]
         return tss
 
     def toUpdates(self) -> Tuple[List[float], List[Node], List[V]]:
         '''Convert a node signal to three lists encoding the updates
         made to the value at each node.
 
-        At present this doesn't handle addition of deletion of nodes.
+        At present this doesn't handle addition of deletion of nodes:
+        deletions are ignored.
 
         :returns: a triple of update times, nodes, and values'''
-        times = []
-        nodes = []
-        values = []
-
-        ns = list(self.network().nodes())
-        ts = self.transitions()
-        if len(ts) > 0:
-            # initial values
-            s_t = self[ts[0]]
-            for n in ns:
-                times.append(ts[0])
-                nodes.append(n)
-                values.append(s_t[n])
-
-            # updates
-            s_t_old = s_t
-            for t in ts[1:]:
-                s_t = self[t]
-                for n in ns:
-                    if s_t[n] != s_t_old[n]:
-                        # value has changed, record as an update
-                        times.append(t)
-                        nodes.append(n)
-                        values.append(s_t[n])
-                s_t_old = s_t
+        # we read each node's updates straight from the diff structure,
+        # rather than comparing every node's value at every transition,
+        # skipping any updates that didn't change the value
+        ns = self._domain()
+        ups = []
+        for (i, n) in enumerate(ns):
+            pv = None
+            for (t, b, v) in self._dict.diffs(n):
+                if b and (pv is None or v != pv):
+                    ups.append((t, i, v))
+                pv = v
+
+        # order the updates by time and then by node
+        ups.sort(key=lambda u: (u[0], u[1]))
+        times = [t for (t, _, _) in ups]
+        nodes = [ns[i] for (_, i, _) in ups]
+        values = [v for (_, _, v) in ups]
 
         return (times, nodes, values)
 
@@ -175,8 +240,7 @@ class Signal(Generic[V]):
         if erase:
             # perform initial erasure
             self._dict = TimedDict()
-        for (t, n, v) in zip(ts, ns, vs):
-            self[t][n] = v
+        self._dict.loadUpdates(ts, ns, vs)
         return self
 
     def fromSeries(self, df: Series, erase: bool = True) -> 'Signal':
@@ -197,5 +261,19 @@ class Signal(Generic[V]):
         from epydemic_signals import SignalExperiment
 
         (tn, nn, vn) = SignalExperiment.signalSeries(self)
-        (ts, ns, vs) = df[tn], df[nn], df[vn]
+        (ts, ns, vs) = [Signal._asList(df[n]) for n in (tn, nn, vn)]
         return self.fromUpdates(ts, ns, vs, erase)
+
+    @staticmethod
+    def _asList(xs: Iterable[Any]) -> Iterable[Any]:
+        '''Convert a column of updates to a list. Columns held in
+        ``numpy`` arrays or ``pandas`` Series are converted in bulk,
+        rather than boxing each element as it's iterated; other
+        iterables are returned unchanged.
+
+        :param xs: the column
+        :returns: the column as a list'''
+        if hasattr(xs, 'tolist'):
+            return xs.tolist()
+        else:
+            return xs
@@ -21,7 +21,7 @@ import sys
 from pandas import Series
 from epydemic import Element, Process
 from epydemic_signals import SignalGenerator, Signal
-from typing import Dict, Any, Tuple, Union, List
+from typing import Dict, Any, Tuple, Union, List, Callable
 if sys.version_info >= (3, 8):
     from typing import Final
 else:
@@ -96,6 +96,7 @@ class SignalExperiment:
         method inherited from :class:`NetworkDynamics` and which is called
         from that class' constructor.'''
         self._signalGenerators : Dict[Process, List[SignalGenerator]] = {}
+        self._eventCallbacks: Dict[Process, List[Callable[[float, str, Element], None]]] = {}
 
     def attachSignalGenerator(self, gen: SignalGenerator, p: Process):
         '''Attach a signal generator to a specific process instance. The generator
@@ -106,7 +107,9 @@ class SignalExperiment:
         :param p: the process'''
         if p not in self._signalGenerators:
             self._signalGenerators[p] = []
+            self._eventCallbacks[p] = []
         self._signalGenerators[p].append(gen)
+        self._eventCallbacks[p].append(gen.event)
         gen.setExperiment(self)
         gen.setProcess(p)
 
@@ -169,6 +172,7 @@ class SignalExperiment:
         :param p: the process that initiated the event
         :param etype: the event type
         :param e: the element'''
-        if p in self._signalGenerators.keys():
-            for gen in self._signalGenerators[p]:
-                gen.event(t, etype, e)
+        cbs = self._eventCallbacks.get(p)
+        if cbs is not None:
+            for cb in cbs:
+                cb(t, etype, e)
@@ -17,7 +17,7 @@
 # You should have received a copy of the GNU General Public License
 # along with epydemic-signals. If not, see <http://www.gnu.org/licenses/gpl.html>.
 
-from typing import Callable, Dict, Any
+from typing import Callable, Dict, List, Union, Any
 from networkx import Graph
 from epydemic import Element, Node, Edge, Process, NetworkExperiment
 from epydemic_signals import Signal
@@ -40,13 +40,17 @@ class SignalGenerator:
 
     :param s: (optional) the signal being generated (creates one if missing)'''
 
+    # Sub-classes that don't declare their own slots will still
+    # get a __dict__ for their attributes
+    __slots__ = ('_experiment', '_process', '_signal', '_typeHandler')
+
     def __init__(self, s: Signal = None):
         if s is None:
             s = Signal()
         self._experiment = None
         self._process = None
         self._signal = s
-        self._typeHandler: Dict[str, EventHandler] = dict()
+        self._typeHandler: Dict[str, Union[EventHandler, List[EventHandler]]] = dict()
 
     def setSignal(self, s: Signal):
         '''Set the signal being generated. This allows re-use of a signal generator
@@ -104,12 +108,18 @@ class SignalGenerator:
 
         :param etype: the event type
         :param eh: the event handler'''
+        # a single handler is stored bare, several as a list
         if etype in self._typeHandler:
-            # append the event to the list of handlers
-            self._typeHandler[etype].append(eh)
+            ehs = self._typeHandler[etype]
+            if type(ehs) is list:
+                # append the event to the list of handlers
+                ehs.append(eh)
+            else:
+                # promote to a list of handlers
+                self._typeHandler[etype] = [ehs, eh]
         else:
             # add the handler
-            self._typeHandler[etype] = [eh]
+            self._typeHandler[etype] = eh
 
 
     # ---------- Tap methods ----------
@@ -142,6 +152,11 @@ class SignalGenerator:
         :param t: the simulation time
         :param etype: the event type
         :param e: the element'''
-        ehs = self._typeHandler.get(etype, [])
-        for eh in ehs:
-            eh(t, e)
+        ehs = self._typeHandler.get(etype)
+        if ehs is None:
+            return
+        if type(ehs) is list:
+            for eh in ehs:
+                eh(t, e)
+        else:
+            ehs(t, e)
@@ -22,6 +22,7 @@ if sys.version_info >= (3, 8):
     from typing import Final
 else:
     from typing_extensions import Final
+from typing import Dict, Any
 from epydemic import SIR, Node
 
 
@@ -34,13 +35,20 @@ class HealingSIR(SIR):
     def __init__(self):
         super().__init__()
         self.T_HEALING = self.stateVariable('tHealing')
+        self._nodeData = None
+
+    def setUp(self, params: Dict[str, Any]):
+        '''Capture the network's node data for recording healing times.
+
+        :param params: the experimental parameters'''
+        super().setUp(params)
+        self._nodeData = self.network().nodes
 
     def markHealed(self, n: Node, t: float):
         '''Mark a node as healed (removed), storing the healing time.
 
         :param n: the node:param t: the time'''
-        g = self.network()
-        g.nodes[n][self.T_HEALING] = t
+        self._nodeData[n][self.T_HEALING] = t
 
     def remove(self, t: float, n: Node):
         '''Save the healing time for the removed node.
@@ -17,8 +17,9 @@
 # You should have received a copy of the GNU General Public License
 # along with epydemic-signals. If not, see <http://www.gnu.org/licenses/gpl.html>.
 
-import numpy
+from itertools import islice
 from typing import Dict, Any
+from epydemic import rng
 from epydemic_signals import HealingSIR
 
 
@@ -39,21 +40,21 @@ class OneInfectionSIR(HealingSIR):
     def initialCompartments(self):
         '''Select a single node to infect.'''
         g = self.network()
-        ns = list(g.nodes())
-        N = len(ns)
+        N = g.order()
 
         # choose one node and infect it
-        rng = numpy.random.default_rng()
         i = rng.integers(N)
-        n = ns[i]
-        self.changeInitialCompartment(n, self.INFECTED)
-        self.markHit(n, 0.0)
-        self._seed = n
+        seed = next(islice(g.nodes(), i, None))
+        self.changeInitialCompartment(seed, self.INFECTED)
+        self.markHit(seed, 0.0)
+        self._seed = seed
 
         # mark all other nodes as susceptible
-        del ns[i]
-        for n in ns:
-            self.changeInitialCompartment(n, self.SUSCEPTIBLE)
+        change = self.changeInitialCompartment
+        S = self.SUSCEPTIBLE
+        for n in g.nodes():
+            if n != seed:
+                change(n, S)
 
     def results(self):
         rc = super().results()
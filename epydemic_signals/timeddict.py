@@ -17,8 +17,10 @@
 # You should have received a copy of the GNU General Public License
 # along with epydemic-signals. If not, see <http://www.gnu.org/licenses/gpl.html>.
 
-from numpy import array, zeros
-from typing import Generic, TypeVar,Union, Dict, Tuple, List, Iterable, cast
+from array import array
+from bisect import bisect_right
+from numpy import ndarray, fromiter
+from typing import Generic, TypeVar,Union, Dict, Tuple, List, Set, Iterable, cast
 
 
 # The top-level class for this code is the TimedDict. This is however a
@@ -36,74 +38,140 @@ X = TypeVar('X')
 Y = TypeVar('Y')
 
 
+class DiffList(Generic[V]):
+    '''The diffs made to a single key of a timed dict, in ascending
+    order of time.
+
+    The diffs are stored column-wise rather than as a list of tuples:
+    an array of update times, a flag for each update that is 1 if it
+    set a value and 0 if it deleted the key, and a list of the values
+    set (None for deletions). This avoids a tuple per update, and lets
+    the times be searched directly.'''
+
+    __slots__ = ('times', 'sets', 'values')
+
+    def __init__(self):
+        self.times = array('d')           # update times
+        self.sets = bytearray()           # 1 for a set, 0 for a delete
+        self.values: List[V] = []         # values set
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def append(self, t: float, b: bool, v: V):
+        '''Add a diff after all the others.
+
+        :param t: the time
+        :param b: True for a set, False for a delete
+        :param v: the value'''
+        self.times.append(t)
+        self.sets.append(b)
+        self.values.append(v)
+
+    def insert(self, i: int, t: float, b: bool, v: V):
+        '''Insert a diff at the given index.
+
+        :param i: the index
+        :param t: the time
+        :param b: True for a set, False for a delete
+        :param v: the value'''
+        self.times.insert(i, t)
+        self.sets.insert(i, b)
+        self.values.insert(i, v)
+
+    def asTuples(self) -> List[Tuple[float, bool, V]]:
+        '''Return the diffs as a list of (time, set, value) triples.
+
+        :returns: a list of triples'''
+        return list(zip(self.times, map(bool, self.sets), self.values))
+
+
 class TimedDictView(Generic[K, V]):
     '''A view of a timed dict snapped at a particular time.
 
-    :param d: the timed dict's diff structure
+    The view is projected lazily: a key's state at the view's time is
+    only found when that key is first accessed, or when an operation
+    (such as :meth:`keys`) needs all the keys. Creating a view and
+    accessing a handful of keys therefore only touches those keys'
+    diff lists.
+
+    :param td: the timed dict
     :param t: the time'''
 
-    # TODO: This needs to be optimised to only look for the "now" state of nodes
-    # that are actually accessed.
+    __slots__ = ('_owner', '_dict', '_time', '_now', '_projected')
 
-    def __init__(self, d: Dict[K, List[Tuple[float, bool, V]]], t : float):
-        self._dict = d                     # dict from key to diff list
+    def __init__(self, td: 'TimedDict[K, V]', t : float):
+        self._owner = td                   # the timed dict we're a view of
+        self._dict = td._dict              # dict from key to diffs
         self._time = t                     # projection time
-        self._now: Dict[K, int] = dict()   # dict from key to index in diff list of last update in diff list
-        self._project()
+        self._now: Dict[K, int] = dict()   # dict from key to index in diff list of last update, or -1 if no value
+        self._projected = False            # True once all keys have been projected
 
 
     # ---------- projection ----------
 
-    def _project(self):
-        '''Project-out the values in the dict at the current time.'''
-        self._now = dict()
-        for k in self._dict:
-            i = self._updateBefore(k)
-            if i >= 0:
-                (_, b, _) = self._dict[k][i]
-                if b:
-                    # update was a set, include this key in the projection
-                    self._now[k] = i
-                else:
-                    # update was a delete, don't include the key
-                    pass
-
-    def _updateBefore(self, k: K) -> int:
-        '''Return the index to the update that occurred on the given entry
-        at or immediately preceeding the current time. Returns -1 if there
-        is no such entry, meaning that the given k has never been added to
-        the dict at any time.
+    def _projectKey(self, k: K) -> int:
+        '''Project-out the value of a single key at the current time,
+        caching the result.
 
         :param k: the key
-        :returns: the index or -1'''
-        if k not in self._dict:
-            # no entry
-            return -1
+        :returns: the index of the key's update in its diff list, or -1 if the key has no value'''
+        ds = self._dict.get(k)
+        if ds is None:
+            # key has never had a value
+            i = -1
         else:
-            vs = self._dict[k]
+            i = TimedDictView._updateBefore(ds, self._time)
+            if i >= 0 and not ds.sets[i]:
+                # update was a delete, don't include the key
+                i = -1
+        self._now[k] = i
+        return i
 
-            # check times
-            (lt, lb, _) = vs[-1]
-            if lt <= self._time:
-                # last update is before the current time
-                return len(vs) - 1
-            else:
-                # last update is after current time, walk the diff list
-                # from the start to find the appropriate update point
-                if len(vs) == 1:
-                    # only one entry that#'s after the current time,
-                    # no point seareching for an appropriate one
-                    return -1
-                else:
-                    for i in range(len(vs) - 1):
-                        (ct, cb, _) = vs[i]
-                        (nt, nb, _) = vs[i + 1]
-                        if nt > self._time:
-                            # we've found the last update
-                            return i
+    def _project(self):
+        '''Project-out the values of all the keys in the dict at the current time.'''
+        if not self._projected:
+            t = self._time
+            now = self._now
+            updateBefore = TimedDictView._updateBefore
+            for (k, ds) in self._dict.items():
+                if k not in now:
+                    i = updateBefore(ds, t)
+                    if i >= 0 and not ds.sets[i]:
+                        # update was a delete, don't include the key
+                        i = -1
+                    now[k] = i
+            self._projected = True
+
+    def _indexNow(self, k: K) -> int:
+        '''Return the index of the key's update in its diff list at the
+        current time, projecting the key if needed.
+
+        :param k: the key
+        :returns: the index, or -1 if the key has no value'''
+        i = self._now.get(k)
+        if i is None:
+            i = self._projectKey(k)
+        return i
 
-            # if we get here, there's a problem with the data structures
-            raise Exception(f'Corrupted diff list for {k}')
+    @staticmethod
+    def _updateBefore(ds: DiffList[V], t: float) -> int:
+        '''Return the index to the update in a key's diffs that occurred
+        at or immediately preceeding the given time. Returns -1 if there
+        is no such entry, meaning that the key has only been added after
+        the given time.
+
+        :param ds: the diffs
+        :param t: the time
+        :returns: the index or -1'''
+        ts = ds.times
+        if ts[-1] <= t:
+            # last update is before the time
+            return len(ts) - 1
+        else:
+            # last update is after the time, search for the
+            # last update at or before it (if any)
+            return bisect_right(ts, t) - 1
 
     def _hasValueNow(self, k):
         '''Test whether a key currently has a value, meaning that it has
@@ -111,7 +179,7 @@ class TimedDictView(Generic[K, V]):
 
         :param k: the key
         :returns: True if the key has a value'''
-        return k in self._now
+        return self._indexNow(k) >= 0
 
 
     # ---------- dict interface ----------
@@ -120,31 +188,31 @@ class TimedDictView(Generic[K, V]):
         '''Return the keys in the dict at the current time.
 
         :returns: a list of keys'''
-        return self._now.keys()
+        self._project()
+        return [k for (k, i) in self._now.items() if i >= 0]
 
     def __contains__(self, k: K) -> bool:
         '''Test whether the given k is defined at the current time.
 
         :param k: the key
         :returns: True if the key is in the dict at the current time'''
-        return k in self.keys()
+        return self._hasValueNow(k)
 
     def values(self) -> Iterable[V]:
-        '''Return a list of values in the dict at the current time.
+        '''Return the values in the dict at the current time. There is
+        one value for each key that has a value, so a value may appear
+        several times: wrap the result in a set to get the distinct values.
 
-        :returns: a list of values'''
-        # sd: should be lazy?
-        vs = set()
-        for k in self._now:
-            (_, _, v) = self._dict[k][self._now[k]]
-            vs.add(v)
-        return vs
+        :returns: an iterator over the values'''
+        self._project()
+        d = self._dict
+        return (d[k].values[i] for (k, i) in self._now.items() if i >= 0)
 
     def __len__(self):
         '''Return the number of entries in the dict at the current time.
 
         :returns: the length of the dict'''
-        return len(self._now)
+        return len(self.keys())
 
     def __getitem__(self, k: K) -> V:
         '''Retrieve the value associated with the given key at the current time.
@@ -161,33 +229,33 @@ class TimedDictView(Generic[K, V]):
 
         :param k: the key
         :param v: the value'''
-        #t = self._time
-        if self._hasValueNow(k):
-            (ct, up, pv) = self._dict[k][self._now[k]]
-            if ct == self._time:
+        t = self._time
+        i = self._indexNow(k)
+        if i >= 0:
+            ds = self._dict[k]
+            if ds.times[i] == t:
                 # update at the current time
-                #print(f'overwritten {k}={v} at time {ct}')
-                self._dict[k][self._now[k]] = (self._time, True, v)
+                ds.values[i] = v
             else:
                 # only perform an update if the value differs from the last one
-                if up and (pv != v):
+                if ds.values[i] != v:
                     # update at a time after the last update, insert a new entry
-                    #print(f'changed {k}={v} at time {t}')
-                    self._dict[k].insert(self._now[k] + 1, (self._time, True, v))
-                    self._now[k] += 1
+                    ds.insert(i + 1, t, True, v)
+                    self._now[k] = i + 1
+                    self._owner._addedUpdate(t)
         else:
-            # new element (at this time)
-            i = self._updateBefore(k)
-            if i < 0:
-                # globally new entry, add to the main dict
-                #print(f'initial {k}={v} at time {t}')
-                self._dict[k] = [(self._time, True, v)]
-                self._now[k] = 0
+            # new element (at this time), either globally new or
+            # after a deletion or before the key's first value
+            ds = self._dict.get(k)
+            if ds is None:
+                ds = DiffList()
+                self._dict[k] = ds
+                i = -1
             else:
-                # new element after a deletion, add an entry
-                #print(f'new {k}={v} at time {t}')
-                self._dict[k].insert(i + 1, (self._time, True, v))
-                self._now[k] = i + 1
+                i = TimedDictView._updateBefore(ds, t)
+            ds.insert(i + 1, t, True, v)
+            self._now[k] = i + 1
+            self._owner._addedUpdate(t)
 
     @staticmethod
     def zipFail(v1s: Iterable[X], v2s: Iterable[Y]) -> Iterable[Tuple[X, Y]]:
@@ -234,19 +302,53 @@ class TimedDictView(Generic[K, V]):
 
         :param ks: the list of keys
         :param ss: the list of values'''
-        for (k, v) in TimedDictView.zipFail(ks, vs):
+        ks = list(ks)
+        vs = list(vs)
+        t = self._time
+        d = self._dict
+        now = self._now
+        for (k, v) in zip(ks, vs):
+            if k not in now:
+                # key not yet projected, see if we can update its diffs directly
+                ds = d.get(k)
+                if ds is None:
+                    # globally new key
+                    ds = DiffList()
+                    ds.append(t, True, v)
+                    d[k] = ds
+                    now[k] = 0
+                    self._owner._addedUpdate(t)
+                    continue
+                elif ds.sets[-1] and ds.times[-1] <= t:
+                    # key's latest update is a value at or before this time
+                    if ds.times[-1] == t:
+                        ds.values[-1] = v
+                    elif ds.values[-1] != v:
+                        ds.append(t, True, v)
+                        self._owner._addedUpdate(t)
+                    now[k] = len(ds) - 1
+                    continue
+
+            # otherwise set through the view
             self[k] = v
 
+        # check we used all the keys and values
+        if len(ks) < len(vs):
+            raise ValueError('Fewer keys than values')
+        elif len(ks) > len(vs):
+            raise ValueError('Fewer values than keys')
+
     def __delitem__(self, k: K):
         '''Delete the mapping for the given key at the current time. This
         does not affect values at earlier times, or assignments in the future.
         It is silent if there is no entry for the given key at the given time.
 
         :param k: the key'''
-        if self._hasValueNow(k):
-            i = self._updateBefore(k)
-            self._dict[k].insert(i + 1, (self._time, False, None))
-            del self._now[k]
+        i = self._indexNow(k)
+        if i >= 0:
+            self._dict[k].insert(i + 1, self._time, False, None)
+            self._now[k] = -1
+            self._owner._addedUpdate(self._time)
 
     def deleteFrom(self, ks: Iterable[K]):
         '''Delete the values associated with several keys.
@@ -263,10 +365,10 @@ class TimedDictView(Generic[K, V]):
         :param k: the key
         :param default: (optional) default value
         :returns: the key value of the default'''
-        if self._hasValueNow(k):
+        i = self._indexNow(k)
+        if i >= 0:
             # key has a value, return it
-            (_, _, v) = self._dict[k][self._now[k]]
-            return v
+            return self._dict[k].values[i]
         elif default is not None:
             # no value, return the default
             return default
@@ -287,7 +389,7 @@ class TimedDictView(Generic[K, V]):
             d[k] = self[k]
         return d
 
-    def asarray(self, ks: Iterable[K] = None) -> array:
+    def asarray(self, ks: Iterable[K] = None) -> ndarray:
         '''Return a snapshot at the current time as a `numpy` array, with
         the order of the values being given by the list of keys. If no
         keys are given then all the keys with current values are used, in
@@ -296,13 +398,19 @@ class TimedDictView(Generic[K, V]):
         :param ks: (optional) the keys (defaults to all)
         :returns: an array'''
         if ks is None:
-            ks = list(self.keys())
-        a = zeros(len(ks))
-        i = 0
+            ks = self.keys()
+
+        # gather the values directly from the diff columns
+        d = self._dict
+        indexNow = self._indexNow
+        vs = []
         for k in ks:
-            a[i] = self[k]
-            i += 1
-        return a
+            i = indexNow(k)
+            if i < 0:
+                t = self._time
+                raise KeyError(f'No key {k} at time {t}')
+            vs.append(d[k].values[i])
+        return fromiter(vs, dtype=float, count=len(vs))
 
 
 class TimedDict(Generic[K, V]):
@@ -313,9 +421,30 @@ class TimedDict(Generic[K, V]):
     we'll access a substantial number of nodes at a given time:
     access is "sparse in time" but "dense in space".'''
 
+    __slots__ = ('_dict', '_time', '_times', '_sorted', '_unsorted')
+
     def __init__(self):
-        self._dict: Dict[K, List[Tuple[float, bool, V]]] = dict()
+        self._dict: Dict[K, DiffList[V]] = dict()
         self._time: float = 0.0
+        self._times: Set[float] = set()       # the times of all updates
+        self._sorted: List[float] = []        # the times of all updates, in ascending order once sorted
+        self._unsorted = False                # True if a time has been added out of order
+
+
+    # ---------- maintaining update times ----------
+
+    def _addedUpdate(self, t: float):
+        '''Record that an update has been made at the given time. Updates
+        are normally added in time order, in which case the sorted list
+        of times is simply extended: an update at an earlier time marks
+        the list as needing to be re-sorted.
+
+        :param t: the update time'''
+        if t not in self._times:
+            self._times.add(t)
+            if len(self._sorted) > 0 and t < self._sorted[-1]:
+                self._unsorted = True
+            self._sorted.append(t)
 
 
     # ---------- access ----------
@@ -330,14 +459,24 @@ class TimedDict(Generic[K, V]):
         the "meaningful changes" to keys.
 
         :returns: a list of times'''
-        ts = set()
-        for k in self._dict:
-            us = self._dict[k]
-            for (t, _, _) in us:
-                ts.add(t)
-        sts = list(ts)
-        sts.sort()
-        return sts
+        if self._unsorted:
+            self._sorted.sort()
+            self._unsorted = False
+        return list(self._sorted)
+
+    def diffs(self, k: K) -> Iterable[Tuple[float, bool, V]]:
+        '''Return the updates made to a key, in ascending order of time.
+        Each update is a triple of the time, a flag that is True if
+        the update set a value and False if it deleted the key, and
+        the value set (or None for deletions). A key that has never
+        been given a value has no updates.
+
+        :param k: the key
+        :returns: a list of updates'''
+        ds = self._dict.get(k)
+        if ds is None:
+            return []
+        return ds.asTuples()
 
     def keysAtSomeTime(self) -> Iterable[K]:
         '''Return the set of keys that appear at some time in the dict.
@@ -375,9 +514,8 @@ class TimedDict(Generic[K, V]):
 
         '''
         vs = set()
-        for k in self._dict:
-            us = self._dict[k]
-            for (_, u, v) in us:
+        for ds in self._dict.values():
+            for (u, v) in zip(ds.sets, ds.values):
                 if u:
                     # we're only concerned with updates, not deletions
                     vs.add(v)
@@ -386,6 +524,45 @@ class TimedDict(Generic[K, V]):
 
     # ---------- dict interface ----------
 
+    def loadUpdates(self, ts: Iterable[float], ks: Iterable[K], vs: Iterable[V]):
+        '''Load a sequence of updates into the dict. The result is the
+        same as setting each key to its value at its time through a view,
+        in order, but the diff lists are extended directly without
+        creating a view for each update. Updates made after a key's latest
+        update -- as is the case when loading updates in time order --
+        take this fast path; any others are made through a view, which is
+        re-used for consecutive updates at the same time.
+
+        :param ts: the update times
+        :param ks: the keys
+        :param vs: the values'''
+        d = self._dict
+        view = None
+        for (t, k, v) in zip(ts, ks, vs):
+            ds = d.get(k)
+            if ds is None:
+                # new key
+                ds = DiffList()
+                ds.append(t, True, v)
+                d[k] = ds
+                self._addedUpdate(t)
+            else:
+                lt = ds.times[-1]
+                lb = ds.sets[-1]
+                if lb and t == lt:
+                    # overwrite the latest value
+                    ds.values[-1] = v
+                elif lb and t > lt:
+                    # add a new value if it's changed
+                    if v != ds.values[-1]:
+                        ds.append(t, True, v)
+                        self._addedUpdate(t)
+                else:
+                    # earlier than the latest update, or after a deletion
+                    if view is None or view._time != t:
+                        view = self[t]
+                    view[k] = v
+
     def __getitem__(self, t: float) -> 'TimedDictView':
         '''Retrieve a view of the dict at the given time. The
         view reflect all changes made to the dict up to and
@@ -393,7 +570,7 @@ class TimedDict(Generic[K, V]):
 
         :param t: the time
         :returns: a view of the dict at that time'''
-        return TimedDictView(self._dict, t)
+        return TimedDictView(self, t)
 
     def __len__(self):
         '''Return the number of transition points in the dict.
@@ -402,9 +579,4 @@ class TimedDict(Generic[K, V]):
         of the set returned by :meth:`updates`.
 
         :returns: the number of update times'''
-        ts = set()
-        for k in self._dict:
-            us = self._dict[k]
-            for (t, _, _) in us:
-                ts.add(t)
-        return len(ts)
+        return len(self._times)
@@ -53,5 +53,5 @@ if not rc[Experiment.METADATA][Experiment.STATUS]:
 
 # save the signals
 with open('sir-er-10000.pickle', 'wb') as fh:
-    pickle.dump(progress, fh)
-    pickle.dump(compartments, fh)
+    pickle.dump(progress, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle.dump(compartments, fh, protocol=pickle.HIGHEST_PROTOCOL)
@@ -17,7 +17,7 @@
 # You should have received a copy of the GNU General Public License
 # along with epydemic-signals. If not, see <http://www.gnu.org/licenses/gpl.html>.
 
-from heapq import heappush, heappop
+from collections import deque
 from epydemic_signals import *
 from epydemic import SIR
 
@@ -52,27 +52,32 @@ class SIRProgressSignalInvariants(SignalGenerator):
         p = self.process()
 
         self._ns = list(g.nodes()).copy()
+        self._adj = dict([(n, list(g.neighbors(n))) for n in g.nodes()])
         self._inf = g.order() + 1
         self._compartment = dict()
         self._compartment[SIR.SUSCEPTIBLE] = set()
         self._compartment[SIR.INFECTED] = set()
         self._compartment[SIR.REMOVED] = set()
+        self._state = dict()
 
         # extract the initial states
         for n in g.nodes():
             c = p.getCompartment(n)
             self._compartment[c].add(n)
+            self._state[n] = c
         self.checkInvariants(0.0)
 
     def infect(self, t, e):
         (s, _) = e
         self._compartment[SIR.SUSCEPTIBLE].remove(s)
         self._compartment[SIR.INFECTED].add(s)
+        self._state[s] = SIR.INFECTED
         self.checkInvariants(t)
 
     def remove(self, t, s):
         self._compartment[SIR.INFECTED].remove(s)
         self._compartment[SIR.REMOVED].add(s)
+        self._state[s] = SIR.REMOVED
         self.checkInvariants(t)
 
     def checkInvariants(self, t):
@@ -101,6 +106,16 @@ class SIRProgressSignalInvariants(SignalGenerator):
         # white-box testing of the algorithm
         self.checkBoundaries(t)
 
+    def boundaryOf(self, n):
+        gen = self._progressSignalGenerator
+        b = gen._boundary[gen._index[n]]
+        return None if b == -1 else gen._nodes[b]
+
+    def coboundaryOf(self, n, cbs):
+        gen = self._progressSignalGenerator
+        i = gen._index[n]
+        return None if i not in cbs else set([gen._nodes[j] for j in cbs[i]])
+
     def checkBoundaries(self, t):
         signal = self.signal()
         sig = signal[t]
@@ -110,39 +125,44 @@ class SIRProgressSignalInvariants(SignalGenerator):
         for n in self._compartment[SIR.SUSCEPTIBLE]:
             if sig[n] == gen._inf:
                 continue
-            if n not in gen._boundary:
+            if self.boundaryOf(n) is None:
                 raise Exception(f'No boundary for susceptible {n}')
         for n in self._compartment[SIR.REMOVED]:
             if sig[n] == -gen._inf:
                 continue
-            if n not in gen._boundary:
+            if self.boundaryOf(n) is None:
                 raise Exception(f'No boundary for removed {n}')
 
         # check all infecteds have coboundaries
         for n in self._compartment[SIR.INFECTED]:
-            if n not in gen._coboundary_S:
+            if self.coboundaryOf(n, gen._coboundary_S) is None:
                 raise Exception(f'No S coboundary for infected {n}')
-            if n not in gen._coboundary_R:
+            if self.coboundaryOf(n, gen._coboundary_R) is None:
                 raise Exception(f'No R coboundary for infected {n}')
 
         # check all boundary nodes lie in the appropriate coboundary
         for n in self._compartment[SIR.SUSCEPTIBLE]:
             if sig[n] == gen._inf:
                 continue
-            if gen._boundary[n] not in gen._coboundary_S:
-                raise Exception(f'No S coboundary for boundary of susceptible {n}', gen._boundary[n] )
-            if n not in gen._coboundary_S[gen._boundary[n]]:
+            cb = self.coboundaryOf(self.boundaryOf(n), gen._coboundary_S)
+            if cb is None:
+                raise Exception(f'No S coboundary for boundary of susceptible {n}', self.boundaryOf(n))
+            if n not in cb:
                 raise Exception(f'S coboundary mismatch for susceptible {n}')
         for n in self._compartment[SIR.REMOVED]:
             if sig[n] == -gen._inf:
                 continue
-            if gen._boundary[n] not in gen._coboundary_R:
-                raise Exception(f'No R coboundary for boundary of removed {n}', gen._boundary[n])
-            if n not in gen._coboundary_R[gen._boundary[n]]:
+            cb = self.coboundaryOf(self.boundaryOf(n), gen._coboundary_R)
+            if cb is None:
+                raise Exception(f'No R coboundary for boundary of removed {n}', self.boundaryOf(n))
+            if n not in cb:
                 raise Exception(f'R coboundary mismatch for removed {n}')
 
     def checkSusceptibles(self, g, sig):
+        adj = self._adj
+        state = self._state
         onpath = set(self._compartment[SIR.SUSCEPTIBLE]).copy()
+        dist = self.distancesFromInfecteds(onpath)
         for n in self._compartment[SIR.SUSCEPTIBLE]:
             #print(f'sus check {n}')
             d = sig[n]
@@ -154,23 +174,27 @@ class SIRProgressSignalInvariants(SignalGenerator):
             # all neighbours should have distances differing by at most one
             # from us (if they're susceptibles), or be infecteds (in which case
             # our distance should be 1), or be removeds
-            for m in g.neighbors(n):
-                if m in self._compartment[SIR.SUSCEPTIBLE]:
+            for m in adj[n]:
+                sm = state[m]
+                if sm == SIR.SUSCEPTIBLE:
                     #print(n, m, d, sig[m])
                     if not (abs(sig[m] - d) <= 1):
                         raise Exception(f'Susceptible {n} neighbour {m} signal diff too large', d, sig[m])
-                elif m in self._compartment[SIR.INFECTED]:
+                elif sm == SIR.INFECTED:
                     if d != 1:
                         raise Exception(f'Susceptible {m} signal next to infected should be 1 but is {d}')
 
             # check our distance to the infected boundary is correct
-            dprime = self.shortestPath(g, n, self._compartment[SIR.INFECTED], onpath)
+            dprime = dist.get(n)
             if dprime is not None:
                 if d != dprime:
                     raise Exception(f'Susceptible {m} path should be {dprime} but is {d}')
 
     def checkRemoveds(self, g, sig):
+        adj = self._adj
+        state = self._state
         onpath = set(self._compartment[SIR.SUSCEPTIBLE]).copy().union(set(self._compartment[SIR.REMOVED]))
+        dist = self.distancesFromInfecteds(onpath)
         for n in self._compartment[SIR.REMOVED]:
             #print(f'rem check {n}')
             d = sig[n]
@@ -183,37 +207,38 @@ class SIRProgressSignalInvariants(SignalGenerator):
             # all neighbours should have distances differing by at most one
             # from us (if they're removeds), or be infecteds (in which case
             # our distance should be 1), or be susceptibles
-            for m in g.neighbors(n):
-                if m in self._compartment[SIR.REMOVED]:
+            for m in adj[n]:
+                sm = state[m]
+                if sm == SIR.REMOVED:
                     #print(n, m, d, sig[m])
                     if not (abs(sig[m] - d) <= 1):
                         raise Exception(f'Removed {n} neighbour {m} signal diff too large', d, sig[m])
-                elif m in self._compartment[SIR.INFECTED]:
+                elif sm == SIR.INFECTED:
                     if d != -1:
                         raise Exception(f'Removed {n} signal should be -1 but is {d}')
 
             # check our distance to the infected boundary is correct
-            dprime = self.shortestPath(g, n, self._compartment[SIR.INFECTED], onpath)
+            dprime = dist.get(n)
             if dprime is not None:
                 if d != -dprime:
                     raise Exception(f'Removed {n} signal should be -{dprime} but is {d}')
 
-    def shortestPath(self, g, s, targets, onpath):
-        distance =[]
-        heappush(distance, (0, s))
-        seen = set([s])
+    def distancesFromInfecteds(self, onpath):
+        # all edges have unit weight, so a FIFO queue visits nodes
+        # in order of distance: searching outwards from all the
+        # infecteds at once finds every node's distance in one pass
+        infecteds = self._compartment[SIR.INFECTED]
+        distance = deque([(0, n) for n in infecteds])
+        dist = dict()
+        seen = set(infecteds)
+        adj = self._adj
         while len(distance) > 0:
-            (d, n) = heappop(distance)
-            if n in targets:
-                # found a node in the target set
-                return d
-
-            # if we're potentially on the path, add all neighbours to be visited
-            if n in onpath:
-                dprime = d + 1
-                ms = g.neighbors(n)
-                for m in ms:
-                    if m not in seen:
-                        seen.add(m)
-                        heappush(distance, (dprime, m))
-        return None
+            (d, n) = distance.popleft()
+            dprime = d + 1
+            for m in adj[n]:
+                # only pass through nodes that can be on the path
+                if m in onpath and m not in seen:
+                    seen.add(m)
+                    dist[m] = dprime
+                    distance.append((dprime, m))
+        return dist
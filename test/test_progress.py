@@ -137,6 +137,15 @@ class ProgressSignalTests(unittest.TestCase):
         self.assertEqual(s[5], 1)
         self.assertEqual(s[6], 1)
 
+    def testUnreachableKeepsBound(self):
+        '''Test that susceptibles becoming unreachable don't lift the bound on susceptible signals.'''
+        self._evs = [(1.0, SIR.REMOVED, 1)]
+        s = self._playEventsTo(1.0)
+        inf = self._generator.infinity()
+        for n in [2, 3, 4, 5, 6]:
+            self.assertEqual(s[n], inf)
+        self.assertEqual(self._generator._maxS, 3)
+
     def testLate(self):
         '''Test the signal doesn't change after the last transition.'''
         self._playEventsTo(6.0)
@@ -206,6 +215,13 @@ class ProgressSignalTests(unittest.TestCase):
         self.assertEqual(s[5], 3)
         self.assertEqual(s[6], 3)
 
+    def testCompartments(self):
+        '''Test the generator tracks compartments as events are played.'''
+        self._playEventsTo(2.0)
+        self.assertEqual(self._generator.compartment(SIR.SUSCEPTIBLE), set([2, 4, 5, 6]))
+        self.assertEqual(self._generator.compartment(SIR.INFECTED), set([3]))
+        self.assertEqual(self._generator.compartment(SIR.REMOVED), set([1]))
+
     # TODO Test that disconnnected sub-graphs generate +/- infinity
 
 
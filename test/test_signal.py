@@ -73,6 +73,21 @@ class SignalTests(unittest.TestCase):
             self.assertEqual(len(ts_n), len(self._signal.transitions()))
             self.assertCountEqual(ts_n, [t * n for t in ts])
 
+    def testArray(self):
+        '''Test we can convert a node signal to a matrix.'''
+        self._signal.setNetwork(self._g)
+        ts = [0, 1, 2, 3]
+        for t in ts:
+            s_t = self._signal[t]
+            for n in self._g.nodes():
+                s_t[n] = t * n
+
+        M = self._signal.asArray()
+        self.assertEqual(M.shape, (len(ts), self._g.order()))
+        for (j, t) in enumerate(ts):
+            for n in self._g.nodes():
+                self.assertEqual(M[j, self._signal.nodeIndex(n)], t * n)
+
     def testUpdates(self):
         '''Test we can convert a node signal to update lists.'''
         self._signal.setNetwork(self._g)
@@ -118,6 +133,31 @@ class SignalTests(unittest.TestCase):
                 self.assertEqual(self._signal[t][n], v)
         self.assertTrue(seenOne)
 
+    def testConvertWithoutNetwork(self):
+        '''Test we can convert a signal loaded from updates without a network.'''
+        sig = Signal(name='x').fromUpdates([0, 0, 1], [1, 2, 1], [5, 6, 7])
+        self.assertIsNone(sig.network())
+        (times, nodes, values) = sig.toUpdates()
+        self.assertEqual(times, [0, 0, 1])
+        self.assertEqual(nodes, [1, 2, 1])
+        self.assertEqual(values, [5, 6, 7])
+        tss = sig.toTimeSeries()
+        self.assertCountEqual(tss.keys(), [1, 2])
+        self.assertEqual(list(tss[1]), [5, 7])
+        self.assertEqual(list(tss[2]), [6, 6])
+
+        # round-trip into another signal
+        sig2 = Signal(name='y').fromUpdates(times, nodes, values)
+        self.assertEqual(sig2.toUpdates(), (times, nodes, values))
+
+    def testNodeIndex(self):
+        '''Test the signal indexes the nodes of its network.'''
+        self._signal.setNetwork(self._g)
+        ns = self._signal.nodes()
+        self.assertCountEqual(ns, self._g.nodes())
+        for (i, n) in enumerate(ns):
+            self.assertEqual(self._signal.nodeIndex(n), i)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -46,6 +46,15 @@ class TimedDictTests(unittest.TestCase):
         self.assertCountEqual(d.values(), [10, 20])
         self.assertEqual(len(d), 2)
 
+    def testValuesRepeated(self):
+        '''Test that values are returned once per key.'''
+        d = self._dict[0]
+        d['a'] = 10
+        d['b'] = 10
+        d['c'] = 20
+        self.assertCountEqual(d.values(), [10, 10, 20])
+        self.assertCountEqual(set(d.values()), [10, 20])
+
     def testAddSequential(self):
         '''Test we can add at different times.'''
         d0 = self._dict[0]
@@ -77,6 +86,14 @@ class TimedDictTests(unittest.TestCase):
         d = self._dict[0.5]
         self.assertCountEqual(d.keys(), ['a'])
 
+    def testLongDiffList(self):
+        '''Test we find the right update in a long diff list.'''
+        for t in range(1, 20):
+            self._dict[t]['a'] = t
+        for t in range(1, 20):
+            self.assertEqual(self._dict[t + 0.5]['a'], t)
+        self.assertNotIn('a', self._dict[0.5])
+
     def testDeleteNever(self):
         '''Test we can silently delete an element that's never been added.'''
         d0 = self._dict[0]
@@ -320,6 +337,18 @@ class TimedDictTests(unittest.TestCase):
         for i in range(len(keys)):
             self.assertEqual(d[keys[i]], vals[i])
 
+    def testSetFromLater(self):
+        '''Test setting several values over earlier values and deletions.'''
+        d = self._dict[0]
+        d.setFrom(['a', 'b', 'c'], [1, 2, 3])
+        del d['c']
+        d = self._dict[1]
+        d.setFrom(['a', 'b', 'c', 'd'], [1, 20, 30, 40])
+        self.assertEqual(d.asdict(), dict(a=1, b=20, c=30, d=40))
+        self.assertEqual(self._dict[0].asdict(), dict(a=1, b=2))
+        self.assertEqual(len(self._dict.diffs('a')), 1)
+        self.assertCountEqual(self._dict.updates(), [0, 1])
+
     def testSetFromFewerKeys(self):
         '''Test we can't have more values than keys.'''
         d = self._dict[0]
@@ -327,6 +356,7 @@ class TimedDictTests(unittest.TestCase):
         vals = [25, 35, 45]
         with self.assertRaises(ValueError):
             d.setFrom(keys, vals)
+        self.assertCountEqual(d.keys(), keys)
 
     def testSetFromFewerValues(self):
         '''Test we can't have more keys than values.'''
@@ -356,6 +386,21 @@ class TimedDictTests(unittest.TestCase):
         d1.deleteFrom(['a', 'c'])
         self.assertCountEqual(d1.keys(), ['b'])
 
+    def testLoadUpdates(self):
+        '''Test loading updates matches setting them one at a time.'''
+        ts = [0, 0, 1, 1, 1, 2, 3, 0.5]
+        ks = ['a', 'b', 'a', 'a', 'b', 'b', 'a', 'a']
+        vs = [1, 2, 3, 4, 2, 5, 5, 6]
+        self._dict.loadUpdates(ts, ks, vs)
+
+        td = TimedDict()
+        for (t, k, v) in zip(ts, ks, vs):
+            td[t][k] = v
+        for k in ['a', 'b']:
+            self.assertEqual(self._dict.diffs(k), td.diffs(k))
+        self.assertEqual(self._dict[1]['a'], 4)
+        self.assertEqual(self._dict[0.5]['a'], 6)
+
 
 if __name__ == '__main__':
     unittest.main()